@@ -19,10 +19,10 @@ from app.api.schemas import (
     TextParseResponse
 )
 from app.services.pinn_service import pinn_service
-from app.services.opendss_service import opendss_service
+from app.services.opendss_service import get_opendss_service
 from app.services.rag_service import rag_service
-from app.services.prompt_service import prompt_service
-from app.core.utils import save_json
+from app.services.prompt_service import get_prompt_service
+from app.core.utils import save_json, load_json
 from app.config import settings
 
 router = APIRouter()
@@ -34,7 +34,7 @@ async def parse_scenario_text(request: TextParseRequest):
     """
     try:
         # Use prompt service to interpret the text
-        parsed_parameters = prompt_service.parse_text_to_parameters(
+        parsed_parameters = get_prompt_service().parse_text_to_parameters(
             text=request.text
         )
         
@@ -60,7 +60,7 @@ async def generate_scenario(request: ScenarioRequest):
         core_parameters = request.parameters.copy()
         
         # Get prompt from prompt service
-        prompt = prompt_service.create_prompt(
+        prompt = get_prompt_service().create_prompt(
             parameters=core_parameters,
             template_name='base'
         )
@@ -109,7 +109,7 @@ async def validate_scenario(request: ValidationRequest):
     """
     try:
         # Validate scenario using OpenDSS
-        validation_result = opendss_service.validate_scenario(request.scenario)
+        validation_result = get_opendss_service().validate_scenario(request.scenario)
         
         return ValidationResponse(
             scenario_id=request.scenario_id,
@@ -211,8 +211,7 @@ async def get_scenario(scenario_id: str):
             )
         
         # Load the scenario
-        with open(scenario_path, 'r') as f:
-            data = json.load(f)
+        data = load_json(scenario_path)
         
         # Return the scenario data
         # Use the "scenario" field if it exists, otherwise return the whole data
@@ -253,8 +252,7 @@ async def get_validation_results(scenario_id: str):
             )
         
         # Load the scenario
-        with open(scenario_path, 'r') as f:
-            data = json.load(f)
+        data = load_json(scenario_path)
         
         # Check if validation results are stored
         if "validation_results" in data:
@@ -264,7 +262,7 @@ async def get_validation_results(scenario_id: str):
             scenario_data = data.get("scenario", data)
             
             # Perform validation
-            validation_result = opendss_service.validate_scenario(scenario_data)
+            validation_result = get_opendss_service().validate_scenario(scenario_data)
             
             return validation_result
     except HTTPException:
@@ -278,7 +276,7 @@ async def create_prompt_template(request: PromptTemplateRequest):
     Create a new prompt template.
     """
     try:
-        template_id = prompt_service.create_template(
+        template_id = get_prompt_service().create_template(
             name=request.name,
             template=request.template,
             parameters=request.parameters
@@ -324,8 +322,7 @@ async def process_uploaded_file(file_path: str):
     """
     try:
         # Load the scenario
-        with open(file_path, 'r') as f:
-            scenario = json.load(f)
+        scenario = load_json(file_path)
         
         # Generate an ID for the scenario
         scenario_id = os.path.basename(file_path).replace('.json', '')
@@ -4,10 +4,16 @@ Utility functions for the grid scenario generator.
 import os
 import json
 import uuid
+import hashlib
 import logging
 import numpy as np
 from typing import Dict, List, Any, Optional, Union
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 logger = logging.getLogger(__name__)
 
 
@@ -21,34 +27,77 @@ def generate_id() -> str:
     return str(uuid.uuid4())
 
 
-def save_json(data: Dict[str, Any], file_path: str) -> None:
+def save_json(data: Dict[str, Any], file_path: str, indent: Optional[int] = 2) -> None:
     """
     Save data as JSON to a file.
     
+    Uses orjson when it is installed, falling back to the standard library.
+    
     Args:
         data: Data to save
         file_path: Output file path
+        indent: Indentation level, or None for compact output
     """
     os.makedirs(os.path.dirname(file_path), exist_ok=True)
     
+    if orjson is not None:
+        option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        if indent is not None:
+            option |= orjson.OPT_INDENT_2
+        with open(file_path, 'wb') as f:
+            f.write(orjson.dumps(data, option=option))
+        return
+    
     with open(file_path, 'w') as f:
-        json.dump(data, f, indent=2)
+        json.dump(data, f, indent=indent)
 
 
 def load_json(file_path: str) -> Dict[str, Any]:
     """
     Load JSON data from a file.
     
+    Uses orjson when it is installed. Files that orjson rejects, such as
+    those containing the NaN/Infinity literals written by the standard
+    library's json.dump, are parsed with the standard library instead.
+    
     Args:
         file_path: Path to JSON file
         
     Returns:
         Loaded data
     """
+    if orjson is not None:
+        with open(file_path, 'rb') as f:
+            raw = f.read()
+        try:
+            return orjson.loads(raw)
+        except orjson.JSONDecodeError:
+            return json.loads(raw)
+    
     with open(file_path, 'r') as f:
         return json.load(f)
 
 
+def json_digest(data: Any) -> str:
+    """
+    Compute a stable content hash of JSON-serializable data.
+    
+    Args:
+        data: Data to hash
+        
+    Returns:
+        Hex digest that is independent of dictionary key order
+    """
+    if orjson is not None:
+        payload = orjson.dumps(
+            data,
+            option=orjson.OPT_SORT_KEYS | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        )
+    else:
+        payload = json.dumps(data, sort_keys=True, separators=(',', ':')).encode('utf-8')
+    return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+
 def ensure_directory(directory: str) -> None:
     """
     Ensure a directory exists.
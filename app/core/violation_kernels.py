@@ -0,0 +1,66 @@
+"""
+Array kernels for detecting voltage and thermal limit violations.
+
+The kernels are JIT-compiled with Numba when it is installed and fall back
+to plain NumPy otherwise.
+"""
+from typing import Tuple
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+
+def _find_voltage_violations(
+    voltages: np.ndarray,
+    lower: float,
+    upper: float
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Find voltages outside the [lower, upper] band.
+    
+    Args:
+        voltages: Bus voltage magnitudes
+        lower: Lower voltage limit
+        upper: Upper voltage limit
+    
+    Returns:
+        Indices and values of the violating voltages
+    """
+    mask = (voltages < lower) | (voltages > upper)
+    return np.flatnonzero(mask), voltages[mask]
+
+
+def _find_thermal_violations(
+    currents: np.ndarray,
+    limits: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Find currents above their element limits.
+    
+    Args:
+        currents: Element current magnitudes
+        limits: Element current limits, aligned with currents
+    
+    Returns:
+        Indices and values of the violating currents
+    """
+    mask = currents > limits
+    return np.flatnonzero(mask), currents[mask]
+
+
+if njit is not None:
+    # parallel=True is left off: its thread pool does not survive the fork
+    # used by time-series worker processes, and these arrays are small
+    find_voltage_violations = njit(cache=True)(_find_voltage_violations)
+    find_thermal_violations = njit(cache=True)(_find_thermal_violations)
+
+    # Compile up front so the first simulation doesn't pay the JIT cost
+    _dummy = np.ones(1, dtype=np.float64)
+    find_voltage_violations(_dummy, 0.95, 1.05)
+    find_thermal_violations(_dummy, _dummy)
+else:
+    find_voltage_violations = _find_voltage_violations
+    find_thermal_violations = _find_thermal_violations
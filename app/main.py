@@ -7,15 +7,15 @@ from fastapi.middleware.cors import CORSMiddleware
 from app.api.routes import router as api_router
 from app.config import settings
 from app.services.pinn_service import PINNService
-from app.services.opendss_service import OpenDSSService
+from app.services.opendss_service import get_opendss_service
 from app.services.rag_service import RAGService
-from app.services.prompt_service import PromptService
+from app.services.prompt_service import get_prompt_service
 
 # Initialize services
 pinn_service = PINNService()
-opendss_service = OpenDSSService()
+opendss_service = get_opendss_service()
 rag_service = RAGService()
-prompt_service = PromptService()
+prompt_service = get_prompt_service()
 
 app = FastAPI(
     title="Grid Scenario Generator",
@@ -1,24 +1,72 @@
 """
 Service for validating power grid scenarios using OpenDSS.
 """
+import io
 import os
 import json
+import math
+import shutil
 import logging
-from typing import Dict, Any, List, Optional
+import tempfile
+import multiprocessing.util
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Any, Iterable, List, Optional, Tuple
 import numpy as np
 import dss
+from app.core.utils import json_digest, load_json, save_json
+from app.core.violation_kernels import find_voltage_violations, find_thermal_violations
 
 logger = logging.getLogger(__name__)
 
+# OpenDSS command templates, formatted once per network element
+_SCRIPT_HEADER = (
+    'Clear\n'
+    'New Circuit.Scenario BasekV=115\n'  # Define base circuit with voltage
+    'Set DefaultBaseFrequency=60\n'
+    'CalcVoltageBases\n'  # Calculate voltage bases
+    'Set Mode=Snap\n'
+    'Set ControlMode=OFF'  # Turn off controls for initial solution
+)
+_SCRIPT_FOOTER = (
+    'Set VoltageBases=[115, 13.8]\n'
+    'CalcVoltageBases\n'
+    'Solve\n'
+    'Show Voltages LN Nodes\n'
+    'Show Currents Elements\n'
+    'Show Powers kVA Elements'
+)
+_BUS_FMT = 'New Load.Load_{uid} Bus1={uid} kV={base_kv} kW=0.001 kvar=0 phases=3'
+_LINE_FMT = (
+    'New Line.{uid} Bus1={fr_bus} Bus2={to_bus} '
+    'R1={r} X1={x} B1={b} Phases=3 NormAmps={norm_amps}'
+)
+_XFMR_FMT = (
+    'New Transformer.{uid} Bus1={fr_bus} Bus2={to_bus} '
+    'R1={r} X1={x} B1={b} NormAmps={mva_ub_nom} EmergAmps={mva_ub_em}'
+)
+_GEN_FMT = 'New Generator.{uid} Bus1={bus} kV={kv} kW={kw} kvar={kvar} Model=3'  # Constant PQ model
+_LOAD_FMT = 'New Load.{uid} Bus1={bus} kW={kw} kvar={kvar} Model=1'  # Constant power load model
+
+# Format version of cached validation results; bump it whenever the result
+# contents change so entries written by older code are no longer used
+_RESULT_CACHE_VERSION = 1
+
 class OpenDSSService:
     """Service for validating power grid scenarios using OpenDSS."""
     
-    def __init__(self, dss_path: Optional[str] = None):
+    def __init__(
+        self,
+        dss_path: Optional[str] = None,
+        cache_dir: Optional[str] = '.gridgen_cache',
+        max_cache_entries: int = 1000
+    ):
         """
         Initialize the OpenDSS service.
         
         Args:
             dss_path: Optional path to OpenDSS installation
+            cache_dir: Directory for cached validation results (None disables caching)
+            max_cache_entries: Maximum number of cached results kept on disk
         """
         try:
             # Initialize OpenDSS with default settings
@@ -38,6 +86,26 @@ class OpenDSSService:
             self.dss.Text.Command = 'Set Mode=Snap'
             self.dss.Text.Command = 'Set ControlMode=Static'
             
+            # Device index/baseline arrays for time-series dispatch
+            self._prod_uids: List[str] = []
+            self._cons_uids: List[str] = []
+            self._prod_p0 = np.empty(0, dtype=np.float64)
+            self._cons_p0 = np.empty(0, dtype=np.float64)
+            self._prod_kvar = np.empty(0, dtype=np.float64)
+            self._cons_kvar = np.empty(0, dtype=np.float64)
+            
+            # Line data of the compiled circuit, fixed across time steps
+            self._line_names: List[str] = []
+            self._line_norm_amps = np.empty(0, dtype=np.float64)
+            self._pd_line_mask = np.empty(0, dtype=bool)
+            
+            # Content hash of the last topology built and its script
+            self._topology_cache: Optional[Tuple[str, str]] = None
+            
+            # On-disk cache of validation results
+            self.cache_dir = cache_dir
+            self.max_cache_entries = max_cache_entries
+            
             logger.info("OpenDSS service initialized successfully")
         except Exception as e:
             logger.error(f"Error initializing OpenDSS: {str(e)}")
@@ -54,9 +122,142 @@ class OpenDSSService:
             Validation results
         """
         try:
-            # Create temporary OpenDSS script
-            script_path = self._create_opendss_script(scenario)
+            # Reuse the stored result if this exact scenario was validated before
+            cache_path = self._cache_path(scenario)
+            if cache_path:
+                cached = self._load_cached_result(cache_path)
+                if cached is not None:
+                    return cached
+            
+            # Build the circuit and run a single snapshot solution
+            self._compile_once(scenario)
+            results = self._solve_and_collect()
+            
+            if cache_path:
+                self._store_cached_result(cache_path, results)
+            
+            return results
+        except Exception as e:
+            logger.error(f"Error validating scenario: {str(e)}")
+            raise
+    
+    def invalidate_cache(self) -> None:
+        """Remove all cached validation results."""
+        if not self.cache_dir or not os.path.isdir(self.cache_dir):
+            return
+        
+        for filename in os.listdir(self.cache_dir):
+            if filename.endswith('.json'):
+                os.remove(os.path.join(self.cache_dir, filename))
+        
+        logger.info(f"Cleared validation cache in {self.cache_dir}")
+    
+    def _cache_path(self, scenario: Dict[str, Any]) -> Optional[str]:
+        """
+        Get the cache file path for a scenario.
+        
+        Args:
+            scenario: Power grid scenario
             
+        Returns:
+            Path keyed by the result format version and the scenario's content
+            hash, or None if caching is disabled
+        """
+        if not self.cache_dir:
+            return None
+        return os.path.join(
+            self.cache_dir, f"v{_RESULT_CACHE_VERSION}-{json_digest(scenario)}.json"
+        )
+    
+    def _load_cached_result(self, cache_path: str) -> Optional[Dict[str, Any]]:
+        """
+        Load a cached validation result.
+        
+        Args:
+            cache_path: Cache file path
+            
+        Returns:
+            Cached results, or None on a cache miss
+        """
+        try:
+            results = load_json(cache_path)
+        except (OSError, ValueError):
+            return None
+        
+        # Mark the entry as recently used for the LRU sweep; another process
+        # may have evicted it since it was read
+        try:
+            os.utime(cache_path)
+        except OSError:
+            pass
+        return results
+    
+    def _store_cached_result(self, cache_path: str, results: Dict[str, Any]) -> None:
+        """
+        Atomically store a validation result and bound the cache size.
+        
+        Args:
+            cache_path: Cache file path
+            results: Validation results
+        """
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        save_json(results, tmp_path, indent=None)
+        os.replace(tmp_path, cache_path)
+        
+        # The result is stored at this point; a failed sweep only means the
+        # cache stays over its size bound until the next store
+        try:
+            self._evict_cache_entries()
+        except OSError as e:
+            logger.warning(f"Error evicting cached validation results: {str(e)}")
+    
+    def _evict_cache_entries(self) -> None:
+        """Remove least recently used entries beyond ``max_cache_entries``."""
+        entries = self._cache_entry_mtimes()
+        if len(entries) <= self.max_cache_entries:
+            return
+        
+        entries.sort()
+        for _, path in entries[:len(entries) - self.max_cache_entries]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+    
+    def _cache_entry_mtimes(self) -> List[Tuple[float, str]]:
+        """
+        List cache entries with their modification times.
+        
+        Entries removed by another process while listing are skipped.
+        
+        Returns:
+            (mtime, path) pairs of the cached results
+        """
+        entries = []
+        for filename in os.listdir(self.cache_dir):
+            if not filename.endswith('.json'):
+                continue
+            path = os.path.join(self.cache_dir, filename)
+            try:
+                entries.append((os.path.getmtime(path), path))
+            except OSError:
+                continue
+        return entries
+    
+    def _compile_once(self, scenario: Dict[str, Any]) -> None:
+        """
+        Compile a scenario into the OpenDSS engine.
+        
+        The topology stays loaded afterwards, so later solves only need
+        to update device setpoints.
+        
+        Args:
+            scenario: Power grid scenario to compile
+        """
+        # Create temporary OpenDSS script
+        script_path = self._create_opendss_script(scenario)
+        
+        try:
             # Clear existing circuit and create new one
             self.dss.Text.Command = 'Clear'
             self.dss.Text.Command = 'New Circuit.Scenario'
@@ -69,20 +270,44 @@ class OpenDSSService:
             self.dss.Text.Command = 'Set ControlMode=Static'
             self.dss.Text.Command = 'Set MaxIterations=100'
             self.dss.Text.Command = 'Set Tolerance=0.0001'
-            
-            # Solve the circuit
-            self.dss.Text.Command = 'Solve'
-            
-            # Get simulation results
-            results = self._get_simulation_results()
-            
+        finally:
             # Clean up temporary files
             os.remove(script_path)
-            
-            return results
-        except Exception as e:
-            logger.error(f"Error validating scenario: {str(e)}")
-            raise
+        
+        self._cache_line_data()
+    
+    def _cache_line_data(self) -> None:
+        """Cache line names, ratings and the line subset of PD elements."""
+        circuit = self.dss.ActiveCircuit
+        
+        # Empty collections report a single 'NONE' name, so go by Count
+        if circuit.Lines.Count == 0:
+            self._line_names = []
+            self._line_norm_amps = np.empty(0, dtype=np.float64)
+        else:
+            self._line_names = list(circuit.Lines.AllNames)
+            self._line_norm_amps = np.fromiter(
+                (line.NormAmps for line in circuit.Lines),
+                dtype=np.float64,
+                count=len(self._line_names)
+            )
+        
+        if circuit.PDElements.Count == 0:
+            self._pd_line_mask = np.empty(0, dtype=bool)
+        else:
+            self._pd_line_mask = np.char.startswith(
+                np.char.lower(np.asarray(circuit.PDElements.AllNames, dtype=str)), 'line.'
+            )
+    
+    def _solve_and_collect(self) -> Dict[str, Any]:
+        """
+        Solve the currently compiled circuit.
+        
+        Returns:
+            Simulation results
+        """
+        self.dss.Text.Command = 'Solve'
+        return self._get_simulation_results()
     
     def _create_opendss_script(self, scenario: Dict[str, Any]) -> str:
         """
@@ -94,116 +319,121 @@ class OpenDSSService:
         Returns:
             Path to created script
         """
-        script_lines = []
-        
         # Log scenario structure for debugging
-        logger.info(f"Creating OpenDSS script for scenario: {json.dumps(scenario['network'].keys())}")
-        
-        # Add base settings
-        script_lines.extend([
-            'Clear',
-            'New Circuit.Scenario BasekV=115',  # Define base circuit with voltage
-            'Set DefaultBaseFrequency=60',
-            'CalcVoltageBases',  # Calculate voltage bases
-            'Set Mode=Snap',
-            'Set ControlMode=OFF'  # Turn off controls for initial solution
+        logger.info(f"Creating OpenDSS script for scenario: {json.dumps(list(scenario['network'].keys()))}")
+        
+        # Stream script to temporary file
+        script_path = f'temp_scenario_{os.getpid()}.dss'
+        try:
+            with open(script_path, 'w', buffering=1 << 20) as f:
+                f.write(_SCRIPT_HEADER)
+                f.write('\n')
+                f.write(self._topology_script(scenario))
+                self._write_dispatch_script(f, scenario)
+                f.write(_SCRIPT_FOOTER)
+        except BaseException:
+            # Don't leave a partial script behind if an element is malformed
+            os.remove(script_path)
+            raise
+        
+        # Log the script for debugging
+        logger.info(f"Generated OpenDSS script saved to {script_path}")
+        
+        return script_path
+    
+    def _topology_script(self, scenario: Dict[str, Any]) -> str:
+        """
+        Build the bus, line and transformer part of the OpenDSS script.
+        
+        The result is cached for the last topology seen, keyed by a content
+        hash of the buses, lines and transformers, so repeated validations
+        of the same network skip rebuilding it while in-place edits to any
+        of those components are still picked up.
+        
+        Args:
+            scenario: Power grid scenario
+            
+        Returns:
+            Topology script text
+        """
+        network = scenario['network']
+        topology_key = json_digest([
+            network['bus'],
+            network['ac_line'],
+            network.get('two_winding_transformer', [])
         ])
+        if self._topology_cache is not None and self._topology_cache[0] == topology_key:
+            return self._topology_cache[1]
         
         # Debug log bus data
-        logger.info(f"Bus data structure: {json.dumps(scenario['network']['bus'][0]) if scenario['network']['bus'] else 'No buses'}")
+        logger.info(f"Bus data structure: {json.dumps(network['bus'][0]) if network['bus'] else 'No buses'}")
+        
+        buf = io.StringIO()
         
         # Add buses - Add nodes to existing circuit
-        for bus in scenario['network']['bus']:
-            bus_id = bus["uid"]
-            base_kv = bus.get("base_nom_volt", 115.0)  # Default to 115 kV if not specified
-            
-            # Basic bus definition with the circuit already established
-            script_lines.append(f'New Load.Load_{bus_id} Bus1={bus_id} kV={base_kv} kW=0.001 kvar=0 phases=3')
-            
+        for bus in network['bus']:
+            buf.write(_BUS_FMT.format(
+                uid=bus['uid'],
+                base_kv=bus.get('base_nom_volt', 115.0)  # Default to 115 kV if not specified
+            ))
+            buf.write('\n')
+        
         # Add lines
-        for line in scenario['network']['ac_line']:
-            fr_bus = line["fr_bus"]
-            to_bus = line["to_bus"]
-            r = line.get("r", 0.01)
-            x = line.get("x", 0.1)
-            b = line.get("b", 0.01)
-            norm_amps = line.get("mva_ub_nom", 100)
-            
-            script_lines.append(
-                f'New Line.{line["uid"]} '
-                f'Bus1={fr_bus} '
-                f'Bus2={to_bus} '
-                f'R1={r} '
-                f'X1={x} '
-                f'B1={b} '
-                f'Phases=3 '
-                f'NormAmps={norm_amps}'
-            )
+        for line in network['ac_line']:
+            buf.write(_LINE_FMT.format(
+                uid=line['uid'],
+                fr_bus=line['fr_bus'],
+                to_bus=line['to_bus'],
+                r=line.get('r', 0.01),
+                x=line.get('x', 0.1),
+                b=line.get('b', 0.01),
+                norm_amps=line.get('mva_ub_nom', 100)
+            ))
+            buf.write('\n')
         
         # Add transformers
-        for xfmr in scenario['network'].get('two_winding_transformer', []):
-            script_lines.append(
-                f'New Transformer.{xfmr["uid"]} '
-                f'Bus1={xfmr["fr_bus"]} '
-                f'Bus2={xfmr["to_bus"]} '
-                f'R1={xfmr["r"]} '
-                f'X1={xfmr["x"]} '
-                f'B1={xfmr["b"]} '
-                f'NormAmps={xfmr["mva_ub_nom"]} '
-                f'EmergAmps={xfmr["mva_ub_em"]}'
-            )
+        for xfmr in network.get('two_winding_transformer', []):
+            buf.write(_XFMR_FMT.format_map(xfmr))
+            buf.write('\n')
         
-        # Add generators
-        for gen in scenario['network']['simple_dispatchable_device']:
-            if gen['device_type'] == 'producer':
-                bus_id = gen["bus"]
-                kw = gen["initial_status"].get("p", 100) * 1000  # Convert to kW
-                kvar = gen["initial_status"].get("q", 20) * 1000  # Convert to kVAR
-                kv = gen.get("vg", 1.0) * 115  # Use voltage in kV
-                
-                script_lines.append(
-                    f'New Generator.{gen["uid"]} '
-                    f'Bus1={bus_id} '
-                    f'kV={kv} '
-                    f'kW={kw} '
-                    f'kvar={kvar} '
-                    f'Model=3'  # Constant PQ model
-                )
-        
-        # Add loads
-        for load in scenario['network']['simple_dispatchable_device']:
-            if load['device_type'] == 'consumer':
-                bus_id = load["bus"]
-                kw = load["initial_status"].get("p", 100) * 1000  # Convert to kW
-                kvar = load["initial_status"].get("q", 20) * 1000  # Convert to kVAR
-                
-                script_lines.append(
-                    f'New Load.{load["uid"]} '
-                    f'Bus1={bus_id} '
-                    f'kW={kw} '
-                    f'kvar={kvar} '
-                    f'Model=1'  # Constant power load model
-                )
-        
-        # Add solution commands
-        script_lines.extend([
-            'Set VoltageBases=[115, 13.8]',
-            'CalcVoltageBases',
-            'Solve',
-            'Show Voltages LN Nodes',
-            'Show Currents Elements',
-            'Show Powers kVA Elements'
-        ])
+        script = buf.getvalue()
+        self._topology_cache = (topology_key, script)
+        return script
+    
+    def _write_dispatch_script(self, f: io.TextIOBase, scenario: Dict[str, Any]) -> None:
+        """
+        Write the generator and load part of the OpenDSS script.
         
-        # Save script to temporary file
-        script_path = 'temp_scenario.dss'
-        with open(script_path, 'w') as f:
-            f.write('\n'.join(script_lines))
+        Args:
+            f: Open script file
+            scenario: Power grid scenario
+        """
+        load_buf = io.StringIO()
         
-        # Log the script for debugging
-        logger.info(f"Generated OpenDSS script saved to {script_path}")
+        # Single pass over devices: generators go straight to the file,
+        # loads are buffered so they still follow all generators
+        for device in scenario['network']['simple_dispatchable_device']:
+            if device['device_type'] == 'producer':
+                # Add generator
+                f.write(_GEN_FMT.format(
+                    uid=device['uid'],
+                    bus=device['bus'],
+                    kv=device.get('vg', 1.0) * 115,  # Use voltage in kV
+                    kw=device['initial_status'].get('p', 100) * 1000,  # Convert to kW
+                    kvar=device['initial_status'].get('q', 20) * 1000  # Convert to kVAR
+                ))
+                f.write('\n')
+            elif device['device_type'] == 'consumer':
+                # Add load
+                load_buf.write(_LOAD_FMT.format(
+                    uid=device['uid'],
+                    bus=device['bus'],
+                    kw=device['initial_status'].get('p', 100) * 1000,  # Convert to kW
+                    kvar=device['initial_status'].get('q', 20) * 1000  # Convert to kVAR
+                ))
+                load_buf.write('\n')
         
-        return script_path
+        f.write(load_buf.getvalue())
     
     def _get_simulation_results(self) -> Dict[str, Any]:
         """
@@ -221,31 +451,33 @@ class OpenDSSService:
         }
         
         # Check convergence
-        if not self.dss.Solution.Converged:
+        if not self.dss.ActiveCircuit.Solution.Converged:
             results['success'] = False
             results['convergence'] = False
             return results
         
-        # Check voltage violations
-        for bus in self.dss.ActiveCircuit.Buses:
-            voltage = bus.VMagAngle[0]
-            if voltage < 0.95 or voltage > 1.05:
-                results['voltage_violations'].append({
-                    'bus': bus.Name,
-                    'voltage': voltage,
-                    'limit': '0.95-1.05 p.u.'
-                })
-        
-        # Check thermal violations
-        for line in self.dss.ActiveCircuit.Lines:
-            current = line.Currents[0]
-            norm_amps = line.NormAmps
-            if current > norm_amps:
-                results['thermal_violations'].append({
-                    'line': line.Name,
-                    'current': current,
-                    'limit': norm_amps
-                })
+        circuit = self.dss.ActiveCircuit
+        
+        # Check voltage violations (phase-1 node of every bus, in p.u.)
+        voltages = np.asarray(circuit.AllNodeVmagPUByPhase(1), dtype=np.float64)
+        node_names = circuit.AllNodeNamesByPhase(1)
+        indices, values = find_voltage_violations(voltages, 0.95, 1.05)
+        for i, voltage in zip(indices.tolist(), values.tolist()):
+            results['voltage_violations'].append({
+                'bus': node_names[i].split('.')[0],
+                'voltage': voltage,
+                'limit': '0.95-1.05 p.u.'
+            })
+        
+        # Check thermal violations against the ratings cached at compile time
+        currents = self._get_line_currents()
+        indices, values = find_thermal_violations(currents, self._line_norm_amps)
+        for i, current in zip(indices.tolist(), values.tolist()):
+            results['thermal_violations'].append({
+                'line': self._line_names[i],
+                'current': current,
+                'limit': float(self._line_norm_amps[i])
+            })
         
         # Get power flow results
         results['power_flow'] = {
@@ -256,21 +488,52 @@ class OpenDSSService:
         
         return results
     
+    def _get_line_currents(self) -> np.ndarray:
+        """
+        Get the maximum conductor current of every line in one bulk call.
+        
+        Returns:
+            Line currents in amps, ordered like ``_line_names``
+        """
+        if not self._line_names:
+            return np.empty(0, dtype=np.float64)
+        currents = np.asarray(self.dss.ActiveCircuit.PDElements.AllMaxCurrents())
+        return currents[self._pd_line_mask]
+    
     def validate_time_series(
         self,
         scenario: Dict[str, Any],
-        time_steps: List[float]
+        time_steps: List[float],
+        max_workers: Optional[int] = None,
+        chunk_size: int = 168,
+        violation_sink: Optional[Callable[[Dict[str, List[Dict[str, Any]]]], None]] = None
     ) -> Dict[str, Any]:
         """
         Validate scenario over multiple time steps.
         
+        Time steps are independent power flows over the same topology, so
+        they are spread across worker processes, each holding its own
+        OpenDSS engine with the scenario compiled once. Every step is solved
+        from the same initial point, so results do not depend on the number
+        of workers. Steps are solved in chunks so long horizons can stream
+        violations out as they go.
+        
         Args:
             scenario: Power grid scenario
             time_steps: List of time steps to validate
+            max_workers: Number of worker processes (defaults to CPU count,
+                1 solves in-process)
+            chunk_size: Number of time steps solved per chunk
+            violation_sink: Optional callback receiving each chunk's
+                ``voltage_violations``/``thermal_violations``; when given,
+                violations are not accumulated in the returned results
             
         Returns:
             Time series validation results
         """
+        if chunk_size < 1:
+            raise ValueError(f"chunk_size must be at least 1, got {chunk_size}")
+        
         results = {
             'success': True,
             'time_steps': [],
@@ -278,61 +541,224 @@ class OpenDSSService:
             'thermal_violations': []
         }
         
-        for t in time_steps:
-            # Update scenario for time step
-            updated_scenario = self._update_scenario_for_time_step(scenario, t)
-            
-            # Validate scenario
-            step_results = self.validate_scenario(updated_scenario)
+        # Precompute the time-varying scale factors for all steps at once
+        time_array = np.asarray(time_steps, dtype=np.float64)
+        gen_scale = 1.0 + 0.1 * np.sin(time_array)
+        load_scale = 1.0 + 0.1 * np.cos(time_array)
+        
+        n_workers = min(max_workers or os.cpu_count() or 1, len(time_steps))
+        executor = None
+        if n_workers > 1:
+            executor = ProcessPoolExecutor(
+                max_workers=n_workers,
+                initializer=_init_time_series_worker,
+                initargs=(scenario, self.dss_path)
+            )
+        else:
+            # Topology is fixed across time steps, so compile it only once
+            self._compile_once(scenario)
+            self._index_devices(scenario)
+        
+        try:
+            for start in range(0, len(time_steps), chunk_size):
+                chunk_steps = time_steps[start:start + chunk_size]
+                chunk_gen = gen_scale[start:start + chunk_size].tolist()
+                chunk_load = load_scale[start:start + chunk_size].tolist()
+                
+                if executor is not None:
+                    # Amortize inter-process overhead over several steps per task
+                    step_results = executor.map(
+                        _solve_time_step_in_worker,
+                        chunk_gen,
+                        chunk_load,
+                        chunksize=math.ceil(len(chunk_steps) / (4 * n_workers))
+                    )
+                else:
+                    step_results = map(self._solve_time_step, chunk_gen, chunk_load)
+                
+                chunk_results = {
+                    'time_steps': [],
+                    'voltage_violations': [],
+                    'thermal_violations': []
+                }
+                self._record_time_series(chunk_results, chunk_steps, step_results)
+                
+                results['time_steps'].extend(chunk_results.pop('time_steps'))
+                if violation_sink is not None:
+                    violation_sink(chunk_results)
+                else:
+                    results['voltage_violations'].extend(chunk_results['voltage_violations'])
+                    results['thermal_violations'].extend(chunk_results['thermal_violations'])
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        
+        return results
+    
+    def _solve_time_step(self, gen_scale: float, load_scale: float) -> Dict[str, Any]:
+        """
+        Solve one time step against the already compiled circuit.
+        
+        Args:
+            gen_scale: Generation scale factor for the time step
+            load_scale: Load scale factor for the time step
             
+        Returns:
+            Simulation results for the time step
+        """
+        # Compute setpoints for time step
+        prod_p, cons_p = self._dispatch_for_time_step(gen_scale, load_scale)
+        
+        # Push new setpoints into the compiled circuit
+        self._apply_dispatch(prod_p, cons_p)
+        
+        # Re-setting the mode discards the previous step's solution, so every
+        # step starts from the same initial point regardless of which steps
+        # this engine solved before; results then don't depend on how steps
+        # are scheduled across workers
+        self.dss.Text.Command = 'Set Mode=Snap'
+        return self._solve_and_collect()
+    
+    def _record_time_series(
+        self,
+        results: Dict[str, Any],
+        time_steps: List[float],
+        step_results: Iterable[Dict[str, Any]]
+    ) -> None:
+        """
+        Merge per-step simulation results into time series results.
+        
+        Args:
+            results: Time series results to update
+            time_steps: List of time steps
+            step_results: Simulation results, one per time step
+        """
+        for t, step in zip(time_steps, step_results):
             # Record results
             results['time_steps'].append({
                 'time': t,
-                'success': step_results['success'],
-                'convergence': step_results['convergence']
+                'success': step['success'],
+                'convergence': step['convergence']
             })
             
             # Record violations
-            for violation in step_results['voltage_violations']:
+            for violation in step['voltage_violations']:
                 violation['time'] = t
                 results['voltage_violations'].append(violation)
             
-            for violation in step_results['thermal_violations']:
+            for violation in step['thermal_violations']:
                 violation['time'] = t
                 results['thermal_violations'].append(violation)
-        
-        return results
     
-    def _update_scenario_for_time_step(
+    def _dispatch_for_time_step(
         self,
-        scenario: Dict[str, Any],
-        time_step: float
-    ) -> Dict[str, Any]:
+        gen_scale: float,
+        load_scale: float
+    ) -> Tuple[np.ndarray, np.ndarray]:
         """
-        Update scenario for a specific time step.
+        Compute device setpoints for a specific time step.
+        
+        Setpoints are derived from the baseline snapshot taken by
+        ``_index_devices``; the scenario itself is never modified.
         
         Args:
-            scenario: Power grid scenario
-            time_step: Time step to update for
+            gen_scale: Generation scale factor for the time step
+            load_scale: Load scale factor for the time step
             
         Returns:
-            Updated scenario
+            Producer and consumer active power, in scenario units
         """
-        updated_scenario = scenario.copy()
+        # For demonstration, we'll just scale the power output/demand
+        return self._prod_p0 * gen_scale, self._cons_p0 * load_scale
+    
+    def _index_devices(self, scenario: Dict[str, Any]) -> None:
+        """
+        Snapshot producer/consumer names, baseline active power and the
+        reactive power setpoints (in kvar) as arrays.
         
-        # Update generator outputs
-        for gen in updated_scenario['network']['simple_dispatchable_device']:
-            if gen['device_type'] == 'producer':
-                # For demonstration, we'll just scale the power output
-                gen['initial_status']['p'] *= (1 + 0.1 * np.sin(time_step))
+        Args:
+            scenario: Power grid scenario
+        """
+        devices = scenario['network']['simple_dispatchable_device']
+        device_types = np.array(
+            [device['device_type'] for device in devices], dtype=object
+        )
+        base_p = np.array(
+            [device['initial_status'].get('p', 100) for device in devices],
+            dtype=np.float64
+        )
+        base_kvar = np.array(
+            [device['initial_status'].get('q', 20) for device in devices],
+            dtype=np.float64
+        ) * 1000  # Convert to kVAR
+        
+        prod_idx = np.flatnonzero(device_types == 'producer')
+        cons_idx = np.flatnonzero(device_types == 'consumer')
+        self._prod_uids = [devices[i]['uid'] for i in prod_idx]
+        self._cons_uids = [devices[i]['uid'] for i in cons_idx]
+        self._prod_p0 = base_p[prod_idx]
+        self._cons_p0 = base_p[cons_idx]
+        self._prod_kvar = base_kvar[prod_idx]
+        self._cons_kvar = base_kvar[cons_idx]
+    
+    def _apply_dispatch(self, prod_p: np.ndarray, cons_p: np.ndarray) -> None:
+        """
+        Write device setpoints directly into the compiled circuit.
         
-        # Update load demands
-        for load in updated_scenario['network']['simple_dispatchable_device']:
-            if load['device_type'] == 'consumer':
-                # For demonstration, we'll just scale the power demand
-                load['initial_status']['p'] *= (1 + 0.1 * np.cos(time_step))
+        Setting kW in OpenDSS keeps the power factor and rescales kvar, so
+        the baseline kvar is written back after every kW update to keep
+        reactive power fixed, as in the scenario.
         
-        return updated_scenario
+        Args:
+            prod_p: Producer active power, ordered like ``_prod_uids``
+            cons_p: Consumer active power, ordered like ``_cons_uids``
+        """
+        generators = self.dss.ActiveCircuit.Generators
+        loads = self.dss.ActiveCircuit.Loads
+        
+        for uid, kw, kvar in zip(
+            self._prod_uids, (prod_p * 1000).tolist(), self._prod_kvar.tolist()  # Convert to kW
+        ):
+            generators.Name = uid
+            generators.kW = kw
+            generators.kvar = kvar
+        
+        for uid, kw, kvar in zip(
+            self._cons_uids, (cons_p * 1000).tolist(), self._cons_kvar.tolist()  # Convert to kW
+        ):
+            loads.Name = uid
+            loads.kW = kw
+            loads.kvar = kvar
+
+# Per-process state for time-series worker processes
+_worker_service: Optional[OpenDSSService] = None
+
+def _init_time_series_worker(scenario: Dict[str, Any], dss_path: Optional[str]) -> None:
+    """Create this worker's OpenDSS engine and compile the scenario once."""
+    global _worker_service
+    _worker_service = OpenDSSService(dss_path)
+    
+    # Give each worker its own data directory so report files written by
+    # the compiled script don't collide between processes
+    data_dir = tempfile.mkdtemp(prefix='gridgen_dss_')
+    _worker_service.dss.DataPath = data_dir
+    multiprocessing.util.Finalize(
+        None, shutil.rmtree, args=(data_dir,), kwargs={'ignore_errors': True}, exitpriority=0
+    )
+    
+    _worker_service._compile_once(scenario)
+    _worker_service._index_devices(scenario)
+
+def _solve_time_step_in_worker(gen_scale: float, load_scale: float) -> Dict[str, Any]:
+    """Solve one time step with this worker's compiled circuit."""
+    return _worker_service._solve_time_step(gen_scale, load_scale)
+
+# Global instance of the OpenDSSService, created on first use
+_opendss_service: Optional[OpenDSSService] = None
 
-# Create a global instance of the OpenDSSService
-opendss_service = OpenDSSService()
\ No newline at end of file
+def get_opendss_service() -> OpenDSSService:
+    """Get the shared OpenDSSService, creating it on first call."""
+    global _opendss_service
+    if _opendss_service is None:
+        _opendss_service = OpenDSSService()
+    return _opendss_service
\ No newline at end of file
@@ -4,12 +4,20 @@ Service for generating prompts for power grid scenario generation.
 import os
 import json
 import logging
+import itertools
 import re
+from collections import OrderedDict
 from typing import Dict, Any, List, Optional
-from jinja2 import Environment, FileSystemLoader
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
 
 logger = logging.getLogger(__name__)
 
+# Per-bus line of the RAG context summary
+_BUS_LINE_FMT = "- Bus {uid}: V={vm:.4f} p.u., θ={va:.4f} rad"
+
+# Maximum number of formatted RAG scenarios kept in memory
+_CONTEXT_CACHE_SIZE = 256
+
 class PromptService:
     """Service for generating prompts for power grid scenario generation."""
     
@@ -21,11 +29,21 @@ class PromptService:
             templates_dir: Directory containing prompt templates
         """
         self.templates_dir = templates_dir or os.path.join('app', 'templates')
+        
+        # Prompts are plain text, so no HTML escaping; compiled templates are
+        # kept in memory and on disk across process restarts (Jinja's default
+        # bytecode directory is private to the current user)
         self.env = Environment(
             loader=FileSystemLoader(self.templates_dir),
-            autoescape=True
+            autoescape=False,
+            cache_size=-1,
+            auto_reload=False,
+            trim_blocks=True,
+            lstrip_blocks=True,
+            bytecode_cache=FileSystemBytecodeCache()
         )
         self.templates = {}
+        self._context_cache: 'OrderedDict[Any, str]' = OrderedDict()
         
         # Load templates
         self._load_templates()
@@ -217,40 +235,73 @@ Output ONLY the JSON object with no additional text."""
         Returns:
             Formatted context text
         """
-        context_parts = ["Similar Scenarios:"]
+        formatted_items = (
+            self._format_context_item(item['scenario'], item['similarity'])
+            for item in context
+        )
+        return '\n\n'.join(itertools.chain(["Similar Scenarios:"], formatted_items))
+    
+    def _format_context_item(self, scenario: Dict[str, Any], similarity: float) -> str:
+        """
+        Format a single RAG context item.
         
-        for item in context:
-            scenario = item['scenario']
-            similarity = item['similarity']
-            
-            # Extract key information
-            network = scenario['network']
-            buses = network['bus']
-            lines = network['ac_line']
-            devices = network['simple_dispatchable_device']
-            
-            # Format scenario information
-            scenario_text = [
-                f"Scenario (similarity: {similarity:.4f}):",
-                f"- Buses: {len(buses)}",
-                f"- Lines: {len(lines)}",
-                f"- Devices: {len(devices)}"
-            ]
-            
-            # Add bus information
-            for bus in buses[:3]:  # Limit to first 3 buses
-                scenario_text.append(
-                    f"- Bus {bus['uid']}: "
-                    f"V={bus['initial_status']['vm']:.4f} p.u., "
-                    f"θ={bus['initial_status']['va']:.4f} rad"
-                )
+        Args:
+            scenario: Similar scenario
+            similarity: Similarity score of the scenario
             
-            if len(buses) > 3:
-                scenario_text.append(f"- ... and {len(buses) - 3} more buses")
+        Returns:
+            Formatted scenario text
+        """
+        return f"Scenario (similarity: {similarity:.4f}):\n{self._scenario_summary(scenario)}"
+    
+    def _scenario_summary(self, scenario: Dict[str, Any]) -> str:
+        """
+        Summarize a scenario's network, reusing earlier results by scenario ID.
+        
+        Scenarios without an ID are formatted every time.
+        
+        Args:
+            scenario: Similar scenario
             
-            context_parts.append('\n'.join(scenario_text))
+        Returns:
+            Formatted network summary
+        """
+        scenario_id = scenario.get('scenario_id', scenario.get('id'))
+        if scenario_id is not None:
+            cached = self._context_cache.get(scenario_id)
+            if cached is not None:
+                self._context_cache.move_to_end(scenario_id)
+                return cached
+        
+        # Extract key information
+        network = scenario['network']
+        buses = network['bus']
+        lines = network['ac_line']
+        devices = network['simple_dispatchable_device']
+        
+        # Format scenario information
+        scenario_text = [
+            f"- Buses: {len(buses)}",
+            f"- Lines: {len(lines)}",
+            f"- Devices: {len(devices)}"
+        ]
         
-        return '\n\n'.join(context_parts)
+        # Add bus information
+        scenario_text.extend(
+            _BUS_LINE_FMT.format(uid=bus['uid'], **bus['initial_status'])
+            for bus in buses[:3]  # Limit to first 3 buses
+        )
+        
+        if len(buses) > 3:
+            scenario_text.append(f"- ... and {len(buses) - 3} more buses")
+        
+        summary = '\n'.join(scenario_text)
+        if scenario_id is not None:
+            # Evict the least recently used summary once the cache is full
+            self._context_cache[scenario_id] = summary
+            if len(self._context_cache) > _CONTEXT_CACHE_SIZE:
+                self._context_cache.popitem(last=False)
+        return summary
     
     def parse_text_to_parameters(self, text: str) -> Dict[str, Any]:
         """
@@ -421,15 +472,17 @@ Output ONLY the JSON object with no additional text."""
         """
         try:
             # Validate template
-            self.env.from_string(template)
-        
-        # Save template
+            compiled = self.env.from_string(template)
+            
+            # Save template atomically so a crash never leaves a partial file
             template_path = os.path.join(self.templates_dir, f"{name}.jinja2")
-            with open(template_path, 'w') as f:
+            tmp_path = f"{template_path}.tmp"
+            with open(tmp_path, 'w') as f:
                 f.write(template)
+            os.replace(tmp_path, template_path)
             
-            # Reload templates
-            self._load_templates()
+            # Register only the new template instead of rescanning the directory
+            self.templates[name] = compiled
             
             return name
         except Exception as e:
@@ -460,5 +513,12 @@ Output ONLY the JSON object with no additional text."""
         """
         return list(self.templates.keys())
 
-# Create a global instance of the PromptService
-prompt_service = PromptService()
\ No newline at end of file
+# Global instance of the PromptService, created on first use
+_prompt_service: Optional[PromptService] = None
+
+def get_prompt_service() -> PromptService:
+    """Get the shared PromptService, creating it on first call."""
+    global _prompt_service
+    if _prompt_service is None:
+        _prompt_service = PromptService()
+    return _prompt_service
\ No newline at end of file
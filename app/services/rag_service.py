@@ -2,12 +2,12 @@
 Service for Retrieval-Augmented Generation (RAG) of power grid scenarios.
 """
 import os
-import json
 import logging
 from typing import List, Dict, Any, Optional
 import numpy as np
 from sentence_transformers import SentenceTransformer
 from sklearn.metrics.pairwise import cosine_similarity
+from app.core.utils import load_json
 
 logger = logging.getLogger(__name__)
 
@@ -44,10 +44,9 @@ class RAGService:
             data_dir = os.path.join('data', 'processed')
             for filename in os.listdir(data_dir):
                 if filename.endswith('.json'):
-                    with open(os.path.join(data_dir, filename), 'r') as f:
-                        scenario = json.load(f)
-                        scenario_id = filename.replace('.json', '')
-                        self.scenario_data[scenario_id] = scenario
+                    scenario = load_json(os.path.join(data_dir, filename))
+                    scenario_id = filename.replace('.json', '')
+                    self.scenario_data[scenario_id] = scenario
             
             # Load or generate embeddings
             embeddings_file = os.path.join('data', 'embeddings', 'scenario_embeddings.npy')
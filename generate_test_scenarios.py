@@ -4,37 +4,39 @@ This will create sample scenarios that can be used to test the validation system
 """
 
 import os
-import json
 import datetime
+from concurrent.futures import ProcessPoolExecutor
 
-# Setup output directory
+import numpy as np
+
+from app.core.utils import save_json
+
+# Output directory
 SCENARIOS_DIR = os.path.join("data", "processed")
-os.makedirs(SCENARIOS_DIR, exist_ok=True)
 
-def create_scenario(scenario_id, name, description, config, metadata):
+# Creation date stamped into every scenario's metadata
+_TODAY = datetime.date.today().isoformat()
+
+def create_scenario(scenario_id, name, description, config, metadata, indent=2):
     """Create a scenario with the given configuration"""
     
-    # Create base network structure
-    network = {
-        "base_mva": 100,
-        "bus": [],
-        "ac_line": [],
-        "simple_dispatchable_device": []
-    }
+    num_buses = config["num_buses"]
+    num_generators = config["num_generators"]
+    num_loads = config["num_loads"]
+    
+    # Compute per-bus type and voltage as arrays
+    idx = np.arange(num_buses)
+    bus_types = np.where(idx == 0, "SLACK", np.where(idx < num_generators, "PV", "PQ"))
+    voltages = np.full(num_buses, config.get("voltage", 1.0), dtype=float)
+    
+    # For invalid voltage scenarios, make some buses have invalid voltages
+    if config.get("invalid_voltage", False):
+        voltages[(idx > 0) & (idx % 2 == 0)] = 0.92  # Below minimum
+        voltages[(idx > 0) & (idx % 2 == 1)] = 1.07  # Above maximum
     
     # Add buses
-    for i in range(config["num_buses"]):
-        bus_type = "SLACK" if i == 0 else "PV" if i < config["num_generators"] else "PQ"
-        voltage = config.get("voltage", 1.0)
-        
-        # For invalid voltage scenarios, make some buses have invalid voltages
-        if config.get("invalid_voltage", False) and i > 0:
-            if i % 2 == 0:
-                voltage = 0.92  # Below minimum
-            else:
-                voltage = 1.07  # Above maximum
-        
-        network["bus"].append({
+    buses = [
+        {
             "bus_id": f"Bus{i+1}",
             "type": bus_type,
             "area": 1,
@@ -50,18 +52,18 @@ def create_scenario(scenario_id, name, description, config, metadata):
               "vm": voltage,
               "va": 0.0
             }
-        })
+        }
+        for i, bus_type, voltage in zip(idx.tolist(), bus_types.tolist(), voltages.tolist())
+    ]
+    
+    # Add lines, connected in a ring for more than 2 buses
+    line_capacity = config.get("line_capacity", 300.0)
+    r_value = config.get("r_value", 0.01)
+    x_value = config.get("x_value", 0.1)
+    to_buses = np.where(idx[:-1] + 2 <= num_buses, idx[:-1] + 2, 1)
     
-    # Add lines
-    for i in range(config["num_buses"] - 1):
-        # Connect in a ring for more than 2 buses
-        to_bus = i + 2 if i + 2 <= config["num_buses"] else 1
-        
-        line_capacity = config.get("line_capacity", 300.0)
-        r_value = config.get("r_value", 0.01)
-        x_value = config.get("x_value", 0.1)
-        
-        network["ac_line"].append({
+    lines = [
+        {
             "uid": f"Line{i+1}-{to_bus}",
             "fr_bus": f"Bus{i+1}",
             "to_bus": f"Bus{to_bus}",
@@ -76,12 +78,17 @@ def create_scenario(scenario_id, name, description, config, metadata):
             "initial_status": {
               "on_status": 1
             }
-        })
+        }
+        for i, to_bus in enumerate(to_buses.tolist())
+    ]
     
     # Add generators and loads
-    for i in range(config["num_generators"]):
-        pg_value = config.get("pg_value", 100.0)
-        network["simple_dispatchable_device"].append({
+    pg_value = config.get("pg_value", 100.0)
+    pd_value = config.get("pd_value", 100.0)
+    load_buses = np.minimum(np.arange(num_loads) + num_generators + 1, num_buses)
+    
+    devices = [
+        {
             "uid": f"Gen{i+1}",
             "bus": f"Bus{i+1}",
             "device_type": "producer",
@@ -97,12 +104,11 @@ def create_scenario(scenario_id, name, description, config, metadata):
               "p": pg_value / 100,
               "q": 0.1
             }
-        })
-    
-    for i in range(config["num_loads"]):
-        bus_idx = min(config["num_generators"] + i + 1, config["num_buses"])
-        pd_value = config.get("pd_value", 100.0)
-        network["simple_dispatchable_device"].append({
+        }
+        for i in range(num_generators)
+    ]
+    devices.extend(
+        {
             "uid": f"Load{i+1}",
             "bus": f"Bus{bus_idx}",
             "device_type": "consumer",
@@ -113,7 +119,17 @@ def create_scenario(scenario_id, name, description, config, metadata):
               "p": pd_value / 100,
               "q": 0.08
             }
-        })
+        }
+        for i, bus_idx in enumerate(load_buses.tolist())
+    )
+    
+    # Create base network structure
+    network = {
+        "base_mva": 100,
+        "bus": buses,
+        "ac_line": lines,
+        "simple_dispatchable_device": devices
+    }
     
     # Create full scenario
     scenario = {
@@ -124,10 +140,9 @@ def create_scenario(scenario_id, name, description, config, metadata):
         "metadata": metadata
     }
     
-    # Save to file
+    # Save to file (pass indent=None for compact bulk output)
     file_path = os.path.join(SCENARIOS_DIR, f"{scenario_id}.json")
-    with open(file_path, "w") as f:
-        json.dump(scenario, f, indent=2)
+    save_json(scenario, file_path, indent=indent)
     
     print(f"Created scenario: {file_path}")
     return scenario
@@ -148,7 +163,7 @@ valid_scenarios = [
             "pd_value": 150.0
         },
         "metadata": {
-            "creation_date": datetime.datetime.now().strftime("%Y-%m-%d"),
+            "creation_date": _TODAY,
             "version": "1.0",
             "reliability_level": "high",
             "congestion_level": "low",
@@ -169,7 +184,7 @@ valid_scenarios = [
             "pd_value": 120.0
         },
         "metadata": {
-            "creation_date": datetime.datetime.now().strftime("%Y-%m-%d"),
+            "creation_date": _TODAY,
             "version": "1.0",
             "reliability_level": "high",
             "congestion_level": "low",
@@ -194,7 +209,7 @@ invalid_scenarios = [
             "pd_value": 120.0
         },
         "metadata": {
-            "creation_date": datetime.datetime.now().strftime("%Y-%m-%d"),
+            "creation_date": _TODAY,
             "version": "1.0",
             "reliability_level": "low",
             "congestion_level": "high",
@@ -215,7 +230,7 @@ invalid_scenarios = [
             "pd_value": 250.0        # higher load
         },
         "metadata": {
-            "creation_date": datetime.datetime.now().strftime("%Y-%m-%d"),
+            "creation_date": _TODAY,
             "version": "1.0",
             "reliability_level": "low",
             "congestion_level": "high",
@@ -236,7 +251,7 @@ invalid_scenarios = [
             "pd_value": 100.0
         },
         "metadata": {
-            "creation_date": datetime.datetime.now().strftime("%Y-%m-%d"),
+            "creation_date": _TODAY,
             "version": "1.0",
             "reliability_level": "low",
             "congestion_level": "medium",
@@ -245,30 +260,27 @@ invalid_scenarios = [
     }
 ]
 
+def _create_scenario_from_spec(scenario):
+    """Create a scenario from one of the spec dicts below (process pool entry point)"""
+    return create_scenario(
+        scenario["id"],
+        scenario["name"],
+        scenario["description"],
+        scenario["config"],
+        scenario["metadata"],
+        indent=None  # Compact output when generating in bulk
+    )
+
 def main():
     print("Generating test scenarios...")
     
-    # Create valid scenarios
-    print("\nCreating valid scenarios:")
-    for scenario in valid_scenarios:
-        create_scenario(
-            scenario["id"],
-            scenario["name"],
-            scenario["description"],
-            scenario["config"],
-            scenario["metadata"]
-        )
+    # Setup output directory once before fanning out
+    os.makedirs(SCENARIOS_DIR, exist_ok=True)
     
-    # Create invalid scenarios
-    print("\nCreating invalid scenarios:")
-    for scenario in invalid_scenarios:
-        create_scenario(
-            scenario["id"],
-            scenario["name"],
-            scenario["description"],
-            scenario["config"],
-            scenario["metadata"]
-        )
+    # Create valid and invalid scenarios in parallel
+    print("\nCreating scenarios:")
+    with ProcessPoolExecutor() as executor:
+        list(executor.map(_create_scenario_from_spec, valid_scenarios + invalid_scenarios))
     
     print("\nAll test scenarios created successfully!")
     print(f"Scenarios are located in: {os.path.abspath(SCENARIOS_DIR)}")
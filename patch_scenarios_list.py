@@ -4,223 +4,339 @@ Run this script to ensure all scenarios in the list are marked as valid.
 """
 
 import os
+import re
+import ast
 import sys
+import json
+import mmap
+import atexit
 import shutil
 import logging
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 
 # Setup logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-def backup_file(file_path):
-    """Create a backup of the given file with .bak extension"""
-    backup_path = file_path + '.bak'
-    if not os.path.exists(backup_path):
-        shutil.copy2(file_path, backup_path)
-        logger.info(f"Created backup of {file_path} at {backup_path}")
-    return backup_path
+# All ScenarioListPage.js edits, matched in a single pass and dispatched on the group name
+_SCEN_RE = re.compile(
+    r'(?P<insert>^[ \t]*let scenariosData = result\.scenarios \|\| \[\];$)'
+    r'|(?P<false>is_valid: false)'
+    r'|(?P<random>is_valid: Math\.random\(\) > 0\.3)',
+    re.M
+)
+_SCEN_REPLACEMENTS = {
+    # Fix the mock scenarios to always be valid
+    'false': 'is_valid: true // Changed from false to true',
+    # Fix the mock scenarios generation to always be valid
+    'random': 'is_valid: true // Always true instead of random',
+}
+
+# Block inserted after the scenariosData assignment (preceded by a blank line)
+_VALID_BLOCK = '''
+      // Ensure all scenarios are marked as valid
+      scenariosData = scenariosData.map(scenario => ({
+        ...scenario,
+        summary: {
+          ...scenario.summary,
+          is_valid: true // Force all scenarios to be valid
+        }
+      }));'''
+
+# Lines inserted into routes.py and schemas.py
+_TIMESTAMP_ENTRY = '                "timestamp": scenario.get("metadata", {}).get("creation_date", "2023-01-01"),'
+_IS_VALID_ENTRY = '                    "is_valid": True  # Always mark scenarios as valid'
+_IS_VALID_FIELD = '    is_valid: bool = True  # Add is_valid field with default value of True'
+_TIMESTAMP_FIELD = '    timestamp: str = "2023-01-01"  # Add timestamp field with default value'
+
+# Source of the scenario id expression that gets a timestamp entry next to it
+_FILE_ID_EXPR = "os.path.basename(file_path).replace('.json', '')"
 
-def patch_scenario_list_page():
-    """Patch the ScenarioListPage.js file to mark all scenarios as valid"""
+# Model class -> (field to insert after, field line to insert)
+_SCHEMA_FIELDS = {
+    'ScenarioSummary': ('num_devices', _IS_VALID_FIELD),
+    'ScenarioListItem': ('summary', _TIMESTAMP_FIELD),
+}
+
+_NEWLINE_RE = re.compile(r'\n')
+
+# Size/mtime of files seen on previous runs, so unchanged targets are not re-read
+PATCH_STATE_FILE = '.patch_state.json'
+
+def _load_patch_state():
+    """Load the patch state saved by a previous run"""
     try:
-        file_path = os.path.join('frontend', 'src', 'pages', 'ScenarioListPage.js')
-        if not os.path.exists(file_path):
-            logger.error(f"ScenarioListPage.js not found at {file_path}")
-            return False
-        
-        # Backup the file
-        backup_file(file_path)
-        
-        # Read the content
-        with open(file_path, 'r') as f:
-            content = f.read()
-        
-        # Check if already patched
-        if "// Ensure all scenarios are marked as valid" in content:
-            logger.info("ScenarioListPage.js already patched. Skipping.")
-            return True
-        
-        # Add code to mark all scenarios as valid
-        lines = content.split('\n')
-        new_lines = []
-        found_fetch_scenarios = False
-        added_patch = False
-        
-        for line in lines:
-            new_lines.append(line)
-            
-            # Find the fetch scenarios function and add our patch
-            if "let scenariosData = result.scenarios || [];" in line and not added_patch:
-                found_fetch_scenarios = True
-                new_lines.append('')
-                new_lines.append('      // Ensure all scenarios are marked as valid')
-                new_lines.append('      scenariosData = scenariosData.map(scenario => ({')
-                new_lines.append('        ...scenario,')
-                new_lines.append('        summary: {')
-                new_lines.append('          ...scenario.summary,')
-                new_lines.append('          is_valid: true // Force all scenarios to be valid')
-                new_lines.append('        }')
-                new_lines.append('      }));')
-                added_patch = True
-            
-            # Fix the mock scenarios to always be valid
-            if "is_valid: false" in line:
-                new_lines[-1] = line.replace("is_valid: false", "is_valid: true // Changed from false to true")
-            
-            # Fix the mock scenarios generation to always be valid
-            if "is_valid: Math.random() > 0.3" in line:
-                new_lines[-1] = line.replace("is_valid: Math.random() > 0.3", "is_valid: true // Always true instead of random")
+        with open(PATCH_STATE_FILE, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _save_patch_state():
+    """Persist the patch state for the next run"""
+    if not _STATE:
+        return
+    try:
+        with open(PATCH_STATE_FILE, 'w') as f:
+            json.dump(_STATE, f, indent=2)
+    except OSError as e:
+        logger.error(f"Error saving patch state: {str(e)}")
+
+_STATE = _load_patch_state()
+atexit.register(_save_patch_state)
+
+def _record_state(path, sentinel, patched):
+    """Remember whether the file as it is now on disk contains the sentinel"""
+    st = os.stat(path)
+    _STATE[path] = {
+        'size': st.st_size,
+        'mtime_ns': st.st_mtime_ns,
+        'sentinel': sentinel,
+        'patched': patched,
+    }
+
+def is_already_patched(path, marker: bytes) -> bool:
+    """
+    Check for a patch marker by scanning the raw bytes of a memory-mapped file.
+    
+    Args:
+        path: Path of the file to check
+        marker: UTF-8 encoded marker text
         
-        if not found_fetch_scenarios:
-            logger.error("Could not find the scenariosData assignment in ScenarioListPage.js")
+    Returns:
+        True if the marker is present
+    """
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            # Empty files cannot be mapped
             return False
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return mm.find(marker) != -1
+
+def already_patched(path, sentinel):
+    """
+    Check whether a file already contains its patch sentinel.
+    
+    The result is cached by file size and modification time, so a file that
+    has not changed since the last run is only stat'ed, not read.
+    
+    Args:
+        path: Path of the file to check
+        sentinel: Text present only in the patched file
         
-        # Write the modified content
-        with open(file_path, 'w') as f:
-            f.write('\n'.join(new_lines))
-        
-        logger.info("Successfully patched ScenarioListPage.js")
-        return True
+    Returns:
+        True if the file is already patched
+    """
+    st = os.stat(path)
+    entry = _STATE.get(path)
+    if (entry and entry.get('sentinel') == sentinel
+            and entry.get('size') == st.st_size
+            and entry.get('mtime_ns') == st.st_mtime_ns):
+        return entry['patched']
     
-    except Exception as e:
-        logger.error(f"Error patching ScenarioListPage.js: {str(e)}")
-        return False
+    patched = is_already_patched(path, sentinel.encode('utf-8'))
+    _record_state(path, sentinel, patched)
+    return patched
 
-def patch_routes_py():
-    """Patch the routes.py file to include is_valid field in scenario list"""
+def backup_file(file_path):
+    """
+    Create a backup of the given file with .bak extension.
+    
+    The backup is a hard link when possible, so no data is copied. Patched
+    files are therefore always written through write_file(), which replaces
+    the file instead of modifying the shared inode in place.
+    """
+    backup_path = file_path + '.bak'
+    if os.path.exists(backup_path):
+        return backup_path
     try:
-        routes_path = os.path.join('app', 'api', 'routes.py')
-        if not os.path.exists(routes_path):
-            logger.error(f"routes.py not found at {routes_path}")
-            return False
-        
-        # Backup the file
-        backup_file(routes_path)
-        
-        # Read the content
-        with open(routes_path, 'r') as f:
-            content = f.read()
-        
-        # Check if already patched
-        if '"is_valid": True  # Always mark scenarios as valid' in content:
-            logger.info("routes.py already patched. Skipping.")
-            return True
-        
-        # Modify the list_scenarios function
-        lines = content.split('\n')
-        new_lines = []
-        found_list_scenarios = False
-        in_summary_block = False
-        patched = False
+        os.link(file_path, backup_path)
+    except OSError:
+        # Cross-device or no hard link support
+        shutil.copyfile(file_path, backup_path)
+    logger.info(f"Created backup of {file_path} at {backup_path}")
+    return backup_path
+
+def write_file(file_path, content):
+    """Write content as UTF-8 to a temporary file and atomically move it over file_path"""
+    tmp_path = file_path + '.tmp'
+    Path(tmp_path).write_text(content, encoding='utf-8')
+    # Keep the target's permission bits instead of the umask default
+    shutil.copymode(file_path, tmp_path)
+    os.replace(tmp_path, file_path)
+
+def _patch_scenario_list(content):
+    """Mark all scenarios in ScenarioListPage.js as valid"""
+    inserted = False
+    
+    def dispatch(match):
+        nonlocal inserted
+        kind = match.lastgroup
+        if kind == 'insert':
+            if inserted:
+                return match.group(0)
+            # Add code to mark all scenarios as valid
+            inserted = True
+            return match.group(0) + '\n' + _VALID_BLOCK
+        return _SCEN_REPLACEMENTS[kind]
+    
+    content = _SCEN_RE.sub(dispatch, content)
+    if not inserted:
+        raise ValueError("Could not find the scenariosData assignment in ScenarioListPage.js")
+    return content
+
+def _splice_lines(content, edits):
+    """
+    Rewrite individual lines of a file without splitting it into a list.
+    
+    Args:
+        content: File content
+        edits: Mapping of 1-based line number to a function rewriting that line
         
-        for line in lines:
-            if 'async def list_scenarios(' in line:
-                found_list_scenarios = True
-            
+    Returns:
+        Content with the edited lines replaced
+    """
+    line_starts = [0] + [m.end() for m in _NEWLINE_RE.finditer(content)]
+    parts = []
+    prev = 0
+    for lineno in sorted(edits):
+        start = line_starts[lineno - 1]
+        end = line_starts[lineno] - 1 if lineno < len(line_starts) else len(content)
+        parts.append(content[prev:start])
+        parts.append(edits[lineno](content[start:end]))
+        prev = end
+    parts.append(content[prev:])
+    return ''.join(parts)
+
+def _dict_entries(node):
+    """Yield (key, value) pairs of a dict literal with constant string keys"""
+    for key, value in zip(node.keys, node.values):
+        if isinstance(key, ast.Constant) and isinstance(key.value, str):
+            yield key.value, key, value
+
+def _add_is_valid_entry(line):
+    """Append the is_valid entry after the num_devices line of a summary dict"""
+    if line.strip().endswith('}'):
+        # If the summary block closes on this line
+        return line.rstrip('}') + ',\n' + _IS_VALID_ENTRY + '\n                }'
+    # If there's more lines in the summary block
+    return line.rstrip(',') + ',\n' + _IS_VALID_ENTRY
+
+def _patch_list_scenarios(content):
+    """Add the timestamp and is_valid fields to the list_scenarios response"""
+    tree = ast.parse(content)
+    func = next(
+        (node for node in tree.body
+         if isinstance(node, ast.AsyncFunctionDef) and node.name == 'list_scenarios'),
+        None
+    )
+    if func is None:
+        raise ValueError("list_scenarios function not found in routes.py")
+    
+    edits = {}
+    summary_patched = False
+    dicts = sorted(
+        (node for node in ast.walk(func) if isinstance(node, ast.Dict)),
+        key=lambda node: (node.lineno, node.col_offset)
+    )
+    for node in dicts:
+        for name, key, value in _dict_entries(node):
             # Add timestamp to scenario item
-            if found_list_scenarios and '"id": os.path.basename(file_path).replace(".json", ""),' in line:
-                new_lines.append(line)
-                new_lines.append('                "timestamp": scenario.get("metadata", {}).get("creation_date", "2023-01-01"),')
-                continue
-            
-            # Find the summary block and add is_valid field
-            if found_list_scenarios and '"summary": {' in line:
-                in_summary_block = True
-                new_lines.append(line)
-                continue
-            
-            if in_summary_block and "num_devices" in line and not patched:
-                # Add is_valid field
-                if line.strip().endswith('}'):
-                    # If the summary block closes on this line
-                    new_line = line.rstrip('}') + ','
-                    new_lines.append(new_line)
-                    new_lines.append('                    "is_valid": True  # Always mark scenarios as valid')
-                    new_lines.append('                }')
-                else:
-                    # If there's more lines in the summary block
-                    new_lines.append(line.rstrip(',') + ',')
-                    new_lines.append('                    "is_valid": True  # Always mark scenarios as valid')
-                patched = True
-                continue
+            if name == 'id' and ast.unparse(value) == _FILE_ID_EXPR:
+                edits[value.end_lineno] = lambda line: line + '\n' + _TIMESTAMP_ENTRY
             
-            new_lines.append(line)
-        
-        if not found_list_scenarios:
-            logger.error("list_scenarios function not found in routes.py")
-            return False
-        
-        # Write the modified content
-        with open(routes_path, 'w') as f:
-            f.write('\n'.join(new_lines))
-        
-        logger.info("Successfully patched routes.py")
-        return True
+            # Add is_valid after num_devices in the first summary block
+            elif name == 'summary' and isinstance(value, ast.Dict) and not summary_patched:
+                for inner_name, inner_key, _ in _dict_entries(value):
+                    if inner_name == 'num_devices':
+                        edits[inner_key.lineno] = _add_is_valid_entry
+                        summary_patched = True
+                        break
     
-    except Exception as e:
-        logger.error(f"Error patching routes.py: {str(e)}")
-        return False
+    return _splice_lines(content, edits)
 
-def patch_schemas_py():
-    """Patch the schemas.py file to include is_valid and timestamp fields"""
+def _add_schema_fields(content):
+    """Add the is_valid field to ScenarioSummary and timestamp to ScenarioListItem"""
+    tree = ast.parse(content)
+    edits = {}
+    for node in tree.body:
+        if not isinstance(node, ast.ClassDef) or node.name not in _SCHEMA_FIELDS:
+            continue
+        anchor, field = _SCHEMA_FIELDS[node.name]
+        for stmt in node.body:
+            if (isinstance(stmt, ast.AnnAssign) and isinstance(stmt.target, ast.Name)
+                    and stmt.target.id == anchor):
+                edits[stmt.end_lineno] = lambda line, field=field: line + '\n' + field
+                break
+    
+    return _splice_lines(content, edits)
+
+# Files to patch: each is read once, run through its transforms in order and written once
+PATCHES = [
+    {
+        'name': 'ScenarioListPage.js',
+        'path': os.path.join('frontend', 'src', 'pages', 'ScenarioListPage.js'),
+        'sentinel': "// Ensure all scenarios are marked as valid",
+        'transforms': [_patch_scenario_list],
+    },
+    {
+        'name': 'routes.py',
+        'path': os.path.join('app', 'api', 'routes.py'),
+        'sentinel': '"is_valid": True  # Always mark scenarios as valid',
+        'transforms': [_patch_list_scenarios],
+    },
+    {
+        'name': 'schemas.py',
+        'path': os.path.join('app', 'api', 'schemas.py'),
+        'sentinel': 'is_valid: bool = True',
+        'transforms': [_add_schema_fields],
+    },
+]
+
+def apply_patch(patch):
+    """
+    Backup, read, transform and write a single file described by a PATCHES entry.
+    
+    Args:
+        patch: Entry with name, path, sentinel and transforms
+        
+    Returns:
+        True if the file is patched (now or previously), False on error
+    """
+    name = patch['name']
+    file_path = patch['path']
     try:
-        schemas_path = os.path.join('app', 'api', 'schemas.py')
-        if not os.path.exists(schemas_path):
-            logger.error(f"schemas.py not found at {schemas_path}")
+        if not os.path.exists(file_path):
+            logger.error(f"{name} not found at {file_path}")
             return False
         
         # Backup the file
-        backup_file(schemas_path)
-        
-        # Read the content
-        with open(schemas_path, 'r') as f:
-            content = f.read()
+        backup_file(file_path)
         
         # Check if already patched
-        if 'is_valid: bool = True' in content:
-            logger.info("schemas.py already patched. Skipping.")
+        if already_patched(file_path, patch['sentinel']):
+            logger.info(f"{name} already patched. Skipping.")
             return True
         
-        # Update ScenarioSummary and ScenarioListItem
-        lines = content.split('\n')
-        new_lines = []
-        found_scenario_summary = False
-        found_scenario_list_item = False
+        # Read the content
+        content = Path(file_path).read_text(encoding='utf-8')
         
-        for line in lines:
-            if 'class ScenarioSummary(BaseModel):' in line:
-                found_scenario_summary = True
-                new_lines.append(line)
-                continue
-            
-            if found_scenario_summary and 'num_devices: int' in line:
-                new_lines.append(line)
-                new_lines.append('    is_valid: bool = True  # Add is_valid field with default value of True')
-                found_scenario_summary = False
-                continue
-            
-            if 'class ScenarioListItem(BaseModel):' in line:
-                found_scenario_list_item = True
-                new_lines.append(line)
-                continue
-            
-            if found_scenario_list_item and 'summary: ScenarioSummary' in line:
-                new_lines.append(line)
-                new_lines.append('    timestamp: str = "2023-01-01"  # Add timestamp field with default value')
-                found_scenario_list_item = False
-                continue
-            
-            new_lines.append(line)
+        for transform in patch['transforms']:
+            content = transform(content)
         
         # Write the modified content
-        with open(schemas_path, 'w') as f:
-            f.write('\n'.join(new_lines))
+        write_file(file_path, content)
+        _record_state(file_path, patch['sentinel'], True)
         
-        logger.info("Successfully patched schemas.py")
+        logger.info(f"Successfully patched {name}")
         return True
     
+    except ValueError as e:
+        logger.error(str(e))
+        return False
+    
     except Exception as e:
-        logger.error(f"Error patching schemas.py: {str(e)}")
+        logger.error(f"Error patching {name}: {str(e)}")
         return False
 
 def main():
@@ -232,12 +348,11 @@ def main():
         logger.error("Please run this script from the GridGen root directory")
         return
     
-    # Patch the files
-    frontend_patched = patch_scenario_list_page()
-    routes_patched = patch_routes_py()
-    schemas_patched = patch_schemas_py()
+    # Patch the files concurrently; each patch touches a different file
+    with ThreadPoolExecutor(max_workers=len(PATCHES)) as executor:
+        results = list(executor.map(apply_patch, PATCHES))
     
-    if frontend_patched and routes_patched and schemas_patched:
+    if all(results):
         logger.info("Patching complete! Your scenarios should now all show as valid in the scenario list.")
         logger.info("To restore the original behavior, use the .bak files that were created.")
     else:
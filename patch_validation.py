@@ -4,23 +4,132 @@ Run this script to ensure scenarios won't show as invalid.
 """
 
 import os
+import re
 import sys
+import mmap
 import shutil
 import importlib.util
 import logging
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 
 # Setup logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Start of the functions to replace and of the next top-level definition
+_PHYSICS_DEF_RE = re.compile(r'^def validate_scenario_physics\(', re.M)
+_TOP_LEVEL_DEF_RE = re.compile(r'^(?:@|(?:async )?def |class )', re.M)
+_VALIDATE_DEF_RE = re.compile(
+    r'^(?P<indent>[ \t]*)def validate_scenario\(self, scenario: Dict\[str, Any\]\) -> Dict\[str, Any\]:.*$',
+    re.M
+)
+
+# Replacement for utils.validate_scenario_physics, including its def line
+_VALIDATE_PHYSICS_REPLACEMENT = '''def validate_scenario_physics(scenario: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Validate that a scenario respects physical constraints.
+    
+    Args:
+        scenario: Scenario data
+        
+    Returns:
+        Dictionary with validation results
+    """
+    # Modified to always return valid results
+    return {
+        "is_valid": True,
+        "voltage_violations": [],
+        "line_violations": [],
+        "flow_results": {
+            "success": True,
+            "flows": {},
+            "theta": []
+        }
+    }'''
+
+# Replacement body for OpenDSSService.validate_scenario, inserted after its def line
+_VALIDATE_SCENARIO_REPLACEMENT = '''
+        """
+        Validate a power grid scenario using OpenDSS.
+        
+        Args:
+            scenario: Power grid scenario to validate
+            
+        Returns:
+            Validation results
+        """
+        # PATCHED: Always return valid results
+        return {
+            "success": True,
+            "convergence": True,
+            "voltage_violations": [],
+            "thermal_violations": [],
+            "is_valid": True
+        }'''
+
 def backup_file(file_path):
-    """Create a backup of the given file with .bak extension"""
+    """
+    Create a backup of the given file with .bak extension.
+    
+    The backup is a hard link when possible, so no data is copied. Patched
+    files are therefore always written through write_file(), which replaces
+    the file instead of modifying the shared inode in place.
+    """
     backup_path = file_path + '.bak'
-    if not os.path.exists(backup_path):
-        shutil.copy2(file_path, backup_path)
-        logger.info(f"Created backup of {file_path} at {backup_path}")
+    if os.path.exists(backup_path):
+        return backup_path
+    try:
+        os.link(file_path, backup_path)
+    except OSError:
+        # Cross-device or no hard link support
+        shutil.copyfile(file_path, backup_path)
+    logger.info(f"Created backup of {file_path} at {backup_path}")
     return backup_path
 
+def write_file(file_path, content):
+    """Write content as UTF-8 to a temporary file and atomically move it over file_path"""
+    tmp_path = file_path + '.tmp'
+    Path(tmp_path).write_text(content, encoding='utf-8')
+    # Keep the target's permission bits instead of the umask default
+    shutil.copymode(file_path, tmp_path)
+    os.replace(tmp_path, file_path)
+
+def is_already_patched(path, marker: bytes) -> bool:
+    """
+    Check for a patch marker by scanning the raw bytes of a memory-mapped file.
+    
+    Args:
+        path: Path of the file to check
+        marker: UTF-8 encoded marker text
+        
+    Returns:
+        True if the marker is present
+    """
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            # Empty files cannot be mapped
+            return False
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return mm.find(marker) != -1
+
+def _splice(content, start, end, replacement):
+    """
+    Replace content[start:end] with replacement, keeping the blank lines
+    that separate the replaced region from the code after it.
+    
+    Args:
+        content: File content
+        start: Start offset of the region to replace
+        end: Offset of the next definition after the region (or len(content))
+        replacement: Replacement text, without a trailing newline
+        
+    Returns:
+        Patched content
+    """
+    end = start + len(content[start:end].rstrip())
+    return content[:start] + replacement + content[end:]
+
 def patch_utils_py():
     """Patch the utils.py file to override validation functions"""
     try:
@@ -32,62 +141,26 @@ def patch_utils_py():
         # Backup the file
         backup_file(utils_path)
         
-        # Read the content
-        with open(utils_path, 'r') as f:
-            content = f.read()
-        
         # Check if already patched
-        if "def validate_scenario_physics_always_valid" in content:
+        if is_already_patched(utils_path, b"def validate_scenario_physics_always_valid"):
             logger.info("utils.py already patched. Skipping.")
             return True
         
+        # Read the content
+        content = Path(utils_path).read_text(encoding='utf-8')
+        
         # Modify the validate_scenario_physics function to always return valid results
-        lines = content.split('\n')
-        new_lines = []
-        found_validation_func = False
-        inside_validation_func = False
-        skip_until_next_def = False
-        
-        for line in lines:
-            if line.startswith("def validate_scenario_physics("):
-                found_validation_func = True
-                inside_validation_func = True
-                new_lines.append("def validate_scenario_physics(scenario: Dict[str, Any]) -> Dict[str, Any]:")
-                new_lines.append('    """')
-                new_lines.append('    Validate that a scenario respects physical constraints.')
-                new_lines.append('    ')
-                new_lines.append('    Args:')
-                new_lines.append('        scenario: Scenario data')
-                new_lines.append('        ')
-                new_lines.append('    Returns:')
-                new_lines.append('        Dictionary with validation results')
-                new_lines.append('    """')
-                new_lines.append('    # Modified to always return valid results')
-                new_lines.append('    return {')
-                new_lines.append('        "is_valid": True,')
-                new_lines.append('        "voltage_violations": [],')
-                new_lines.append('        "line_violations": [],')
-                new_lines.append('        "flow_results": {')
-                new_lines.append('            "success": True,')
-                new_lines.append('            "flows": {},')
-                new_lines.append('            "theta": []')
-                new_lines.append('        }')
-                new_lines.append('    }')
-                skip_until_next_def = True
-            elif line.startswith("def ") and skip_until_next_def:
-                inside_validation_func = False
-                skip_until_next_def = False
-                new_lines.append(line)
-            elif not skip_until_next_def:
-                new_lines.append(line)
-        
-        if not found_validation_func:
+        match = _PHYSICS_DEF_RE.search(content)
+        if not match:
             logger.error("validate_scenario_physics function not found in utils.py")
             return False
         
+        next_def = _TOP_LEVEL_DEF_RE.search(content, match.end())
+        end = next_def.start() if next_def else len(content)
+        content = _splice(content, match.start(), end, _VALIDATE_PHYSICS_REPLACEMENT)
+        
         # Write the modified content
-        with open(utils_path, 'w') as f:
-            f.write('\n'.join(new_lines))
+        write_file(utils_path, content)
         
         logger.info("Successfully patched utils.py")
         return True
@@ -107,61 +180,28 @@ def patch_opendss_service():
         # Backup the file
         backup_file(service_path)
         
-        # Read the content
-        with open(service_path, 'r') as f:
-            content = f.read()
-        
         # Check if already patched
-        if "# PATCHED: Always return valid results" in content:
+        if is_already_patched(service_path, b"# PATCHED: Always return valid results"):
             logger.info("opendss_service.py already patched. Skipping.")
             return True
         
+        # Read the content
+        content = Path(service_path).read_text(encoding='utf-8')
+        
         # Modify the validate_scenario method to always return valid results
-        lines = content.split('\n')
-        new_lines = []
-        found_validation_func = False
-        inside_validation_func = False
-        skip_until_end_of_func = False
-        
-        for line in lines:
-            if line.strip().startswith("def validate_scenario(self, scenario: Dict[str, Any]) -> Dict[str, Any]:"):
-                found_validation_func = True
-                inside_validation_func = True
-                new_lines.append(line)
-                new_lines.append('        """')
-                new_lines.append('        Validate a power grid scenario using OpenDSS.')
-                new_lines.append('        ')
-                new_lines.append('        Args:')
-                new_lines.append('            scenario: Power grid scenario to validate')
-                new_lines.append('            ')
-                new_lines.append('        Returns:')
-                new_lines.append('            Validation results')
-                new_lines.append('        """')
-                new_lines.append('        # PATCHED: Always return valid results')
-                new_lines.append('        return {')
-                new_lines.append('            "success": True,')
-                new_lines.append('            "convergence": True,')
-                new_lines.append('            "voltage_violations": [],')
-                new_lines.append('            "thermal_violations": [],')
-                new_lines.append('            "is_valid": True')
-                new_lines.append('        }')
-                skip_until_end_of_func = True
-            elif skip_until_end_of_func and (line.strip() == "}" or line.strip() == ""):
-                inside_validation_func = False
-                skip_until_end_of_func = False
-                new_lines.append(line)
-            elif skip_until_end_of_func:
-                continue  # Skip lines within the function
-            else:
-                new_lines.append(line)
-        
-        if not found_validation_func:
+        match = _VALIDATE_DEF_RE.search(content)
+        if not match:
             logger.error("validate_scenario function not found in opendss_service.py")
             return False
         
+        # The method body ends at the next member of the class or the next top-level statement
+        indent = re.escape(match.group('indent'))
+        next_def = re.compile(rf'^(?:{indent}(?:@|(?:async )?def )|\S)', re.M).search(content, match.end())
+        end = next_def.start() if next_def else len(content)
+        content = _splice(content, match.end(), end, _VALIDATE_SCENARIO_REPLACEMENT)
+        
         # Write the modified content
-        with open(service_path, 'w') as f:
-            f.write('\n'.join(new_lines))
+        write_file(service_path, content)
         
         logger.info("Successfully patched opendss_service.py")
         return True
@@ -179,9 +219,12 @@ def main():
         logger.error("Please run this script from the GridGen root directory")
         return
     
-    # Patch the files
-    utils_patched = patch_utils_py()
-    opendss_patched = patch_opendss_service()
+    # Patch the files concurrently; each patch touches a different file
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        utils_future = executor.submit(patch_utils_py)
+        opendss_future = executor.submit(patch_opendss_service)
+    utils_patched = utils_future.result()
+    opendss_patched = opendss_future.result()
     
     if utils_patched and opendss_patched:
         logger.info("Patching complete! Your scenarios should now always validate as valid.")